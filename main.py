@@ -1,12 +1,47 @@
 import tkinter as tk
 from tkinter import ttk, messagebox, scrolledtext
 import requests
-import json
 from threading import Thread
 import time
 from abc import ABC, abstractmethod
+from collections import deque
+from itertools import islice
+from types import MappingProxyType
 from datetime import datetime
 import os
+import math
+import tempfile
+
+# orjson швидший за стандартний json; використовуємо його, якщо встановлено
+try:
+    import orjson
+    _loads = orjson.loads
+    _dumps = orjson.dumps
+except ImportError:
+    import json
+    _loads = json.loads
+    def _dumps(obj):
+        return json.dumps(obj, ensure_ascii=False).encode("utf-8")
+
+# ========== ДОПОМІЖНІ ФУНКЦІЇ ==========
+
+# Поточна umask процесу (читається один раз при імпорті, поки немає інших потоків)
+_UMASK = os.umask(0)
+os.umask(_UMASK)
+
+# Спільна HTTP-сесія: повторно використовує з'єднання між оновленнями курсів
+_SESSION = requests.Session()
+
+# Кеш відформатованої поточної хвилини: [номер хвилини, рядок]
+_LAST_MIN = [-1, ""]
+
+def _fmt_minute():
+    """Повернути поточний час у форматі "дд.мм.рррр гг:хх" (кешується в межах хвилини)"""
+    m = int(time.time() // 60)
+    if m != _LAST_MIN[0]:
+        _LAST_MIN[0] = m
+        _LAST_MIN[1] = datetime.fromtimestamp(m * 60).strftime("%d.%m.%Y %H:%M")
+    return _LAST_MIN[1]
 
 # ========== АБСТРАКТНІ КЛАСИ ==========
 
@@ -28,20 +63,56 @@ class ExchangeRateProvider(ABC):
 class OnlineRateProvider(ExchangeRateProvider):
     """Отримує курси валют через API та кешує їх у файл"""
     CACHE_FILE = "exchange_rates_cache.json"
+    CACHE_TTL_SECONDS = 60  # Курси, молодші за цей час, не завантажуються повторно
 
     def __init__(self):
         self.rates = {}
         self.base_currency = "USD"
         self.last_update = None
+        self._rate_cache = {}  # (from, to) -> обчислений крос-курс
+        # Валідатори останньої відповіді API для умовних запитів
+        self._etag = None
+        self._last_modified = None
+
+    def set_rates(self, rates):
+        """Встановити нові курси та скинути кеш крос-курсів"""
+        self.rates = rates
+        self._rate_cache = {}
+
+    def is_fresh(self):
+        """Чи є поточні курси достатньо свіжими, щоб не звертатися до API"""
+        if not self.rates or self.last_update is None:
+            return False
+        # Час оновлення "з майбутнього" (перехід годинника) вважаємо застарілим
+        age = (datetime.now() - self.last_update).total_seconds()
+        return 0 <= age < self.CACHE_TTL_SECONDS
 
-    def fetch_rates(self):
-        """Завантажити курси з API та зберегти у кеш"""
+    def fetch_rates(self, force=False):
+        """Завантажити курси з API та зберегти у кеш (force=True - ігнорувати TTL)"""
+        if not force:
+            if not self.rates:
+                self.load_cache()
+            if self.is_fresh():
+                return True
         try:
             url = f"https://api.exchangerate-api.com/v4/latest/{self.base_currency}"
-            response = requests.get(url, timeout=10)
+            headers = {}
+            if self.rates:
+                if self._etag:
+                    headers["If-None-Match"] = self._etag
+                if self._last_modified:
+                    headers["If-Modified-Since"] = self._last_modified
+            response = _SESSION.get(url, timeout=10, headers=headers)
+            if response.status_code == 304:
+                # Курси не змінилися - залишаємо поточні, але зберігаємо час перевірки
+                self.last_update = datetime.now()
+                self.save_cache()
+                return True
             if response.status_code == 200:
-                data = response.json()
-                self.rates = data['rates']
+                data = _loads(response.content)
+                self.set_rates(data['rates'])
+                self._etag = response.headers.get("ETag")
+                self._last_modified = response.headers.get("Last-Modified")
                 self.last_update = datetime.now()
                 # Зберігаємо у кеш
                 self.save_cache()
@@ -58,8 +129,23 @@ class OnlineRateProvider(ExchangeRateProvider):
                 "base_currency": self.base_currency,
                 "last_update": self.last_update.strftime("%Y-%m-%d %H:%M:%S") if self.last_update else ""
             }
-            with open(self.CACHE_FILE, "w", encoding="utf-8") as f:
-                json.dump(cache_data, f)
+            # Серіалізуємо заздалегідь і записуємо одним викликом write()
+            data = _dumps(cache_data)
+            # Пишемо в унікальний тимчасовий файл (паралельні оновлення не заважають
+            # одне одному) і атомарно підміняємо кеш, щоб перерваний запис
+            # не залишив пошкоджений JSON
+            cache_dir = os.path.dirname(os.path.abspath(self.CACHE_FILE))
+            fd, tmp = tempfile.mkstemp(dir=cache_dir, suffix=".tmp")
+            try:
+                with os.fdopen(fd, "wb") as f:
+                    f.write(data)
+                # mkstemp створює файл з правами 0600 - повертаємо звичайні права
+                os.chmod(tmp, 0o666 & ~_UMASK)
+                os.replace(tmp, self.CACHE_FILE)
+            except Exception:
+                if os.path.exists(tmp):
+                    os.unlink(tmp)
+                raise
         except Exception as e:
             print(f"Помилка збереження кешу: {e}")
 
@@ -67,10 +153,10 @@ class OnlineRateProvider(ExchangeRateProvider):
         """Завантажити курси з кешу"""
         try:
             if os.path.exists(self.CACHE_FILE):
-                with open(self.CACHE_FILE, "r", encoding="utf-8") as f:
-                    cache_data = json.load(f)
-                    self.rates = cache_data.get("rates", {})
+                with open(self.CACHE_FILE, "rb") as f:
+                    cache_data = _loads(f.read())
                     self.base_currency = cache_data.get("base_currency", "USD")
+                    self.set_rates(cache_data.get("rates", {}))
                     last_update_str = cache_data.get("last_update", "")
                     if last_update_str:
                         self.last_update = datetime.strptime(last_update_str, "%Y-%m-%d %H:%M:%S")
@@ -82,6 +168,17 @@ class OnlineRateProvider(ExchangeRateProvider):
     
     def get_exchange_rate(self, from_currency, to_currency):
         """Отримати курс обміну між двома валютами"""
+        # Локальне посилання: якщо set_rates() замінить кеш під час обчислення,
+        # застаріле значення потрапить лише у старий словник
+        cache = self._rate_cache
+        key = (from_currency, to_currency)
+        rate = cache.get(key)
+        if rate is None:
+            rate = cache[key] = self._compute_rate(from_currency, to_currency)
+        return rate
+
+    def _compute_rate(self, from_currency, to_currency):
+        """Обчислити крос-курс за курсами відносно базової валюти"""
         if not self.rates:
             return 0
             
@@ -104,15 +201,16 @@ class OnlineRateProvider(ExchangeRateProvider):
         return 0
     
     def get_all_rates(self):
-        """Отримати всі курси"""
-        return self.rates.copy()
+        """Отримати всі курси (лише для читання, без копіювання)"""
+        return MappingProxyType(self.rates)
 
 class OfflineRateProvider(ExchangeRateProvider):
     """Використовує збережені (кешовані) курси валют з файлу"""
     CACHE_FILE = "exchange_rates_cache.json"
 
-    def __init__(self):
-        self.rates = self.load_cache()
+    def __init__(self, rates=None):
+        # Готові курси (наприклад, з онлайн провайдера) дозволяють не читати файл
+        self.rates = rates or self.load_cache()
         if not self.rates:
             # Якщо кешу немає, fallback на статичні курси
             self.rates = {
@@ -126,8 +224,8 @@ class OfflineRateProvider(ExchangeRateProvider):
         """Завантажити курси з кешу"""
         try:
             if os.path.exists(self.CACHE_FILE):
-                with open(self.CACHE_FILE, "r", encoding="utf-8") as f:
-                    cache_data = json.load(f)
+                with open(self.CACHE_FILE, "rb") as f:
+                    cache_data = _loads(f.read())
                     return cache_data.get("rates", {})
         except Exception as e:
             print(f"Помилка завантаження кешу (офлайн): {e}")
@@ -146,27 +244,31 @@ class OfflineRateProvider(ExchangeRateProvider):
         return 0
     
     def get_all_rates(self):
-        """Повернути всі кешовані курси"""
-        return self.rates.copy()
+        """Повернути всі кешовані курси (лише для читання, без копіювання)"""
+        return MappingProxyType(self.rates)
 
 # ========== МЕНЕДЖЕР ІСТОРІЇ ==========
 
 class HistoryManager:
     """Клас для зберігання та перегляду історії конвертацій"""
     
+    MAX_ENTRIES = 50
+    
     def __init__(self):
-        self.history_list = []
+        # Кільцевий буфер: найстаріші записи відкидаються автоматично
+        self.history_list = deque(maxlen=self.MAX_ENTRIES)
     
     def save_entry(self, entry):
         """Зберегти новий запис в історію"""
         self.history_list.append(entry)
-        # Обмежуємо історію до 50 записів
-        if len(self.history_list) > 50:
-            self.history_list.pop(0)
     
     def get_history(self):
-        """Повернути список всіх записів"""
-        return self.history_list.copy()
+        """Повернути всі записи у вигляді незмінного кортежу"""
+        return tuple(self.history_list)
+    
+    def get_last_entry(self):
+        """Повернути останній запис або None, якщо історія порожня"""
+        return self.history_list[-1] if self.history_list else None
     
     def clear_history(self):
         """Очистити історію"""
@@ -191,38 +293,60 @@ class CurrencyConverter:
             "TRY": "Турецька ліра"
         }
     
-    def convert(self, amount, from_currency, to_currency):
-        """Обчислити результат конвертації"""
+    def convert(self, amount, from_currency, to_currency, record=True):
+        """Обчислити результат конвертації (record=False - не зберігати в історію)"""
+        entry, error = self.convert_entry(amount, from_currency, to_currency)
+        if error:
+            return None, error
+        
+        # Зберігаємо в історію (конвертацію валюти самої в себе не зберігаємо)
+        if record:
+            self.save_to_history(entry)
+        
+        return entry["result"], None
+    
+    def convert_entry(self, amount, from_currency, to_currency):
+        """Обчислити конвертацію і повернути готовий запис історії, не зберігаючи його"""
         try:
-            amount = float(amount)
-            if amount < 0:
-                return None, "Сума не може бути від'ємною"
+            amount, error = self.parse_amount(amount)
+            if error:
+                return None, error
             
             rate = self.get_exchange_rate(from_currency, to_currency)
             
             if rate <= 0:
                 return None, "Не вдалося отримати курс валют"
             
-            result = amount * rate
-            
-            # Зберігаємо в історію
             entry = {
-                "timestamp": datetime.now().strftime("%d.%m.%Y %H:%M"),
+                "timestamp": _fmt_minute(),
                 "amount": amount,
                 "from_currency": from_currency,
                 "to_currency": to_currency,
                 "rate": rate,
-                "result": result
+                "result": amount * rate
             }
-            self.history_manager.save_entry(entry)
-            
-            return result, None
+            return entry, None
             
         except ValueError:
             return None, "Некоректне значення суми"
         except Exception as e:
             return None, f"Помилка конвертації: {str(e)}"
     
+    def parse_amount(self, amount):
+        """Перевірити суму та повернути її як число"""
+        try:
+            amount = float(amount)
+        except ValueError:
+            return None, "Некоректне значення суми"
+        if amount < 0:
+            return None, "Сума не може бути від'ємною"
+        return amount, None
+    
+    def save_to_history(self, entry):
+        """Зберегти вже обчислену конвертацію в історію"""
+        if entry["from_currency"] != entry["to_currency"]:
+            self.history_manager.save_entry(entry)
+    
     def get_exchange_rate(self, from_currency, to_currency):
         """Отримати курс обміну"""
         return self.exchange_rate_provider.get_exchange_rate(from_currency, to_currency)
@@ -231,13 +355,25 @@ class CurrencyConverter:
 
 class UserInterface:
     """Клас для взаємодії з користувачем через графічний інтерфейс"""
+    DEBOUNCE_MS = 80  # Затримка перед перерахунком після введення
+    HISTORY_IDLE_MS = 400  # Пауза у введенні, після якої результат іде в історію
+    AUTO_UPDATE_MS = 300_000  # Інтервал автооновлення курсів (5 хвилин)
     
     def __init__(self, converter):
         self.converter = converter
+        # Провайдери створюються один раз і перевикористовуються при перемиканні режимів
+        provider = converter.exchange_rate_provider
+        self._online = provider if isinstance(provider, OnlineRateProvider) else OnlineRateProvider()
+        self._offline = provider if isinstance(provider, OfflineRateProvider) else None
         self.window = tk.Tk()
         self.setup_window()
         self.create_widgets()
         self.updating_from_code = False
+        self._pending_after = None
+        self._pending_record = None
+        self._unsaved_conversion = None  # Результат введення, ще не збережений в історію
+        self._last_rendered_entry = None
+        self.update_history_display()
         
         # Запускаємо завантаження курсів
         self.refresh_rates()
@@ -324,9 +460,12 @@ class UserInterface:
                                      font=('Segoe UI', 12), bg='#0f3460', fg='white',
                                      insertbackground='#e94560', relief='flat', bd=5, width=12)
         self.amount1_entry.pack(side='left', padx=(0, 10))
-        self.amount1_entry.bind('<KeyRelease>', self.on_amount1_change)
+        # Реагуємо лише на фактичну зміну значення, а не на кожну клавішу
+        self.amount1_var.trace_add("write", self._on_a1_write)
         
         currency_list = [f"{code} - {name}" for code, name in self.converter.currencies.items()]
+        # Таблиця "рядок у списку -> код валюти" для швидкого пошуку
+        self._display_to_code = {f"{code} - {name}": code for code, name in self.converter.currencies.items()}
         
         self.from_dropdown = ttk.Combobox(from_frame, values=currency_list, state='readonly',
                                          font=('Segoe UI', 10), width=25)
@@ -353,7 +492,7 @@ class UserInterface:
                                      font=('Segoe UI', 12), bg='#0f3460', fg='white',
                                      insertbackground='#e94560', relief='flat', bd=5, width=12)
         self.amount2_entry.pack(side='left', padx=(0, 10))
-        self.amount2_entry.bind('<KeyRelease>', self.on_amount2_change)
+        self.amount2_var.trace_add("write", self._on_a2_write)
         
         self.to_dropdown = ttk.Combobox(to_frame, values=currency_list, state='readonly',
                                        font=('Segoe UI', 10), width=25)
@@ -366,7 +505,8 @@ class UserInterface:
         buttons_frame = tk.Frame(parent, bg='#1a1a2e')
         buttons_frame.pack(pady=15)
         
-        refresh_btn = tk.Button(buttons_frame, text="🔄 Оновити курси", command=self.refresh_rates,
+        refresh_btn = tk.Button(buttons_frame, text="🔄 Оновити курси",
+                               command=lambda: self.refresh_rates(force=True),
                                bg='#e94560', fg='white', font=('Segoe UI', 10, 'bold'),
                                relief='flat', padx=15, pady=6, cursor='hand2')
         refresh_btn.pack(side='left', padx=(0, 8))
@@ -376,10 +516,10 @@ class UserInterface:
                              relief='flat', padx=15, pady=6, cursor='hand2')
         clear_btn.pack(side='left', padx=(0, 8))
         
-        offline_btn = tk.Button(buttons_frame, text="📱 Офлайн режим", command=self.toggle_offline_mode,
-                               bg='#4CAF50', fg='white', font=('Segoe UI', 10, 'bold'),
-                               relief='flat', padx=15, pady=6, cursor='hand2')
-        offline_btn.pack(side='left')
+        self.offline_btn = tk.Button(buttons_frame, text="📱 Офлайн режим", command=self.toggle_offline_mode,
+                                    bg='#4CAF50', fg='white', font=('Segoe UI', 10, 'bold'),
+                                    relief='flat', padx=15, pady=6, cursor='hand2')
+        self.offline_btn.pack(side='left')
     
     def create_history_frame(self, parent):
         """Створити фрейм для історії"""
@@ -404,71 +544,157 @@ class UserInterface:
         )
         clear_history_btn.pack(pady=(0, 5))
     
+    @staticmethod
+    def _fmt(x):
+        """Відформатувати число без зайвих нулів після коми"""
+        if x == 0:
+            return "0"
+        if not math.isfinite(x):
+            return str(x)
+        if x == int(x):
+            return str(int(x))
+        return f"{x:.6f}".rstrip('0').rstrip('.')
+    
     def get_selected_currency_code(self, dropdown_value):
         """Отримати код валюти з вибраного значення"""
-        return dropdown_value.split(" - ")[0] if " - " in dropdown_value else dropdown_value
+        return self._display_to_code.get(dropdown_value, dropdown_value)
     
     def on_amount1_change(self, event=None):
         """Обробка зміни першої суми"""
         if not self.updating_from_code:
-            self.update_conversion(direction="forward")
+            self.schedule_update("forward")
     
     def on_amount2_change(self, event=None):
         """Обробка зміни другої суми"""
         if not self.updating_from_code:
-            self.update_conversion(direction="backward")
+            self.schedule_update("backward")
+    
+    def schedule_update(self, direction):
+        """Відкласти конвертацію, щоб об'єднати серію натискань клавіш"""
+        self._cancel_pending()
+        self._pending_after = self.window.after(self.DEBOUNCE_MS, self._do_update, direction)
+    
+    def _cancel_pending(self):
+        """Скасувати відкладені конвертацію та запис в історію"""
+        if self._pending_after:
+            self.window.after_cancel(self._pending_after)
+            self._pending_after = None
+        if self._pending_record:
+            self.window.after_cancel(self._pending_record)
+            self._pending_record = None
+        self._unsaved_conversion = None
+    
+    def _do_update(self, direction):
+        """Виконати відкладену конвертацію (проміжний результат не йде в історію)"""
+        self._pending_after = None
+        self.update_conversion(direction=direction, record=False)
+        if self._unsaved_conversion is not None:
+            self._pending_record = self.window.after(self.HISTORY_IDLE_MS, self._record_update)
+    
+    def _record_update(self):
+        """Зберегти в історію остаточний результат після завершення введення"""
+        self._pending_record = None
+        pending = self._unsaved_conversion
+        self._unsaved_conversion = None
+        if pending is None:
+            return
+        self.converter.save_to_history(pending)
+        entry = self.converter.history_manager.get_last_entry()
+        if entry is not None and entry is not self._last_rendered_entry:
+            self.append_history_line(entry)
+    
+    def _on_a1_write(self, *_):
+        """Обробник запису в змінну першої суми"""
+        self.on_amount1_change()
+    
+    def _on_a2_write(self, *_):
+        """Обробник запису в змінну другої суми"""
+        self.on_amount2_change()
     
     def on_currency_change(self, event=None):
         """Обробка зміни валют"""
+        self._cancel_pending()
         self.update_conversion(direction="forward")
     
-    def update_conversion(self, direction="forward"):
+    def update_conversion(self, direction="forward", record=True):
         """Оновити конвертацію"""
+        self._unsaved_conversion = None
         try:
-            from_curr = self.get_selected_currency_code(self.from_dropdown.get())
-            to_curr = self.get_selected_currency_code(self.to_dropdown.get())
+            # Локальні посилання, щоб не шукати атрибути повторно
+            conv = self.converter
+            a1 = self.amount1_var
+            a2 = self.amount2_var
+            fmt = self._fmt
+            code_of = self.get_selected_currency_code
+            from_curr = code_of(self.from_dropdown.get())
+            to_curr = code_of(self.to_dropdown.get())
             
-            if direction == "forward":
-                amount = self.amount1_var.get()
-                result, error = self.converter.convert(amount, from_curr, to_curr)
+            if from_curr == to_curr:
+                # Та сама валюта - лише перевіряємо і копіюємо суму без конвертації
+                src, dst = (a1, a2) if direction == "forward" else (a2, a1)
+                amount = src.get()
+                _, error = conv.parse_amount(amount)
                 
                 if error:
                     self.show_error(error)
                     return
                 
                 self.updating_from_code = True
-                self.amount2_var.set(f"{result:.6f}".rstrip('0').rstrip('.') if result != 0 else "0")
+                dst.set(amount)
+                self.updating_from_code = False
+                
+            elif direction == "forward":
+                entry, error = conv.convert_entry(a1.get(), from_curr, to_curr)
+                
+                if error:
+                    self.show_error(error)
+                    return
+                
+                if record:
+                    conv.save_to_history(entry)
+                else:
+                    self._unsaved_conversion = entry
+                
+                self.updating_from_code = True
+                a2.set(fmt(entry["result"]))
                 self.updating_from_code = False
                 
             else:  # backward
-                amount = self.amount2_var.get()
-                result, error = self.converter.convert(amount, to_curr, from_curr)
+                entry, error = conv.convert_entry(a2.get(), to_curr, from_curr)
                 
                 if error:
                     self.show_error(error)
                     return
                 
+                if record:
+                    conv.save_to_history(entry)
+                else:
+                    self._unsaved_conversion = entry
+                
                 self.updating_from_code = True
-                self.amount1_var.set(f"{result:.6f}".rstrip('0').rstrip('.') if result != 0 else "0")
+                a1.set(fmt(entry["result"]))
                 self.updating_from_code = False
             
             # Оновити відображення курсу
-            rate = self.converter.get_exchange_rate(from_curr, to_curr)
+            rate = conv.get_exchange_rate(from_curr, to_curr)
             if rate > 0:
+                names = conv.currencies
                 self.rate_label.config(
-                    text=f"1 {self.converter.currencies.get(from_curr, from_curr)} = "
-                         f"{rate:.6f}".rstrip('0').rstrip('.') + 
-                         f" {self.converter.currencies.get(to_curr, to_curr)}"
+                    text=f"1 {names.get(from_curr, from_curr)} = "
+                         f"{fmt(rate)} {names.get(to_curr, to_curr)}"
                 )
             
-            # Оновити історію
-            self.update_history_display()
+            # Дописати новий запис в історію (без повного перемальовування)
+            entry = conv.history_manager.get_last_entry()
+            if entry is not None and entry is not self._last_rendered_entry:
+                self.append_history_line(entry)
             
         except Exception as e:
             self.show_error(f"Помилка обчислення: {str(e)}")
     
     def swap_currencies(self):
         """Поміняти валюти місцями"""
+        self._cancel_pending()
         from_idx = self.from_dropdown.current()
         to_idx = self.to_dropdown.current()
         amount1 = self.amount1_var.get()
@@ -476,83 +702,102 @@ class UserInterface:
         
         self.from_dropdown.current(to_idx)
         self.to_dropdown.current(from_idx)
+        self.updating_from_code = True
         self.amount1_var.set(amount2)
         self.amount2_var.set(amount1)
+        self.updating_from_code = False
     
     def clear_fields(self):
         """Очистити поля вводу"""
+        self._cancel_pending()
+        self.updating_from_code = True
         self.amount1_var.set("0")
         self.amount2_var.set("0")
+        self.updating_from_code = False
     
-    def refresh_rates(self):
+    def refresh_rates(self, force=False):
         """Оновити курси валют"""
+        provider = self.converter.exchange_rate_provider
+        if not isinstance(provider, OnlineRateProvider):
+            return
+        self.status_label.config(text="Оновлення курсів...", fg='#FFA500')
+        
         def update():
-            if isinstance(self.converter.exchange_rate_provider, OnlineRateProvider):
-                self.status_label.config(text="Оновлення курсів...", fg='#FFA500')
-                success = self.converter.exchange_rate_provider.fetch_rates()
-                
-                if success:
-                    self.window.after(0, lambda: self.status_label.config(text="Курси оновлено", fg='#4CAF50'))
-                    timestamp = self.converter.exchange_rate_provider.last_update
-                    if timestamp:
-                        self.window.after(0, lambda: self.update_label.config(
-                            text=f"Останнє оновлення: {timestamp.strftime('%d.%m.%Y %H:%M')}"
-                        ))
-                else:
-                    self.window.after(0, lambda: self.status_label.config(text="Помилка оновлення", fg='#FF5722'))
+            success = provider.fetch_rates(force=force)
+            # Одне звернення до головного потоку Tk з усіма результатами
+            self.window.after(0, self._finish_refresh, success, provider.last_update)
         
         Thread(target=update, daemon=True).start()
     
+    def _finish_refresh(self, success, timestamp):
+        """Відобразити результат оновлення курсів (виконується в головному потоці)"""
+        if success:
+            self.status_label.config(text="Курси оновлено", fg='#4CAF50')
+            if timestamp:
+                self.update_label.config(text=f"Останнє оновлення: {timestamp.strftime('%d.%m.%Y %H:%M')}")
+        else:
+            self.status_label.config(text="Помилка оновлення", fg='#FF5722')
+    
     def toggle_offline_mode(self):
         """Перемикання між онлайн та офлайн режимами"""
         if isinstance(self.converter.exchange_rate_provider, OnlineRateProvider):
-            self.converter.exchange_rate_provider = OfflineRateProvider()
+            if self._offline is None:
+                self._offline = OfflineRateProvider(self._online.rates)
+            elif self._online.rates:
+                # Беремо найсвіжіші курси з онлайн провайдера без читання файлу
+                self._offline.rates = self._online.rates
+            self.converter.exchange_rate_provider = self._offline
             self.status_label.config(text="Офлайн режим активний", fg='#FFA500')
             self.update_label.config(text="Використовуються збережені курси")
             # Змінюємо текст кнопки на "Онлайн режим"
-            for widget in self.window.winfo_children():
-                for child in widget.winfo_children():
-                    if isinstance(child, tk.Button) and "Офлайн режим" in child.cget("text"):
-                        child.config(text="🌐 Онлайн режим")
+            self.offline_btn.config(text="🌐 Онлайн режим")
         else:
-            self.converter.exchange_rate_provider = OnlineRateProvider()
+            self.converter.exchange_rate_provider = self._online
             self.status_label.config(text="Онлайн режим активний", fg='#4CAF50')
             self.refresh_rates()
             # Змінюємо текст кнопки на "Офлайн режим"
-            for widget in self.window.winfo_children():
-                for child in widget.winfo_children():
-                    if isinstance(child, tk.Button) and "Онлайн режим" in child.cget("text"):
-                        child.config(text="📱 Офлайн режим")
+            self.offline_btn.config(text="📱 Офлайн режим")
     
     def auto_update_rates(self):
-        """Автоматичне оновлення курсів"""
-        def update_loop():
-            while True:
-                time.sleep(300)  # 5 хвилин
-                if (self.window.winfo_exists() and 
-                    isinstance(self.converter.exchange_rate_provider, OnlineRateProvider)):
-                    self.refresh_rates()
-                else:
-                    break
-        
-        Thread(target=update_loop, daemon=True).start()
+        """Автоматичне оновлення курсів (таймер Tk, скасовується разом з вікном)"""
+        self.window.after(self.AUTO_UPDATE_MS, self._tick)
+    
+    def _tick(self):
+        """Періодичне оновлення курсів в онлайн режимі"""
+        if isinstance(self.converter.exchange_rate_provider, OnlineRateProvider):
+            self.refresh_rates()
+        self.window.after(self.AUTO_UPDATE_MS, self._tick)
+    
+    def format_history_line(self, entry):
+        """Сформувати рядок історії для відображення"""
+        return (f"{entry['timestamp']} | "
+                f"{entry['amount']:.2f} {entry['from_currency']} → "
+                f"{entry['result']:.4f} {entry['to_currency']} "
+                f"(курс: {entry['rate']:.4f})\n")
     
     def update_history_display(self):
         """Оновити відображення історії"""
         history = self.converter.history_manager.get_history()
         self.history_text.delete(1.0, tk.END)
         
-        for entry in reversed(history[-10:]):  # Показуємо останні 10 записів
-            line = (f"{entry['timestamp']} | "
-                   f"{entry['amount']:.2f} {entry['from_currency']} → "
-                   f"{entry['result']:.4f} {entry['to_currency']} "
-                   f"(курс: {entry['rate']:.4f})\n")
-            self.history_text.insert(tk.END, line)
+        insert = self.history_text.insert
+        fmt_line = self.format_history_line
+        tk_end = tk.END
+        for entry in islice(reversed(history), 10):  # Показуємо останні 10 записів
+            insert(tk_end, fmt_line(entry))
+        self._last_rendered_entry = history[-1] if history else None
+    
+    def append_history_line(self, entry):
+        """Додати новий запис на початок історії, залишивши останні 10"""
+        self.history_text.insert("1.0", self.format_history_line(entry))
+        self.history_text.delete("11.0", tk.END)
+        self._last_rendered_entry = entry
     
     def clear_history(self):
         """Очистити історію"""
+        self._cancel_pending()
         self.converter.history_manager.clear_history()
-        self.history_text.delete(1.0, tk.END)
+        self.update_history_display()
         self.status_label.config(text="Історію очищено", fg='#4CAF50')
     
     def show_result(self, result):